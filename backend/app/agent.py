@@ -1,19 +1,26 @@
 from langchain_openai import ChatOpenAI
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.tools import Tool
 from langchain.memory import ConversationBufferMemory
 from langchain.agents import AgentExecutor, create_openai_functions_agent
+from langchain.agents.format_scratchpad import format_to_openai_function_messages
 
 from app.config import OPENAI_API_KEY, MODEL_NAME, TEMPERATURE
 from app.prompts import RESUME_PROMPT
+from app.usage import UsageTracker
 
 def generate_resume(query: str) -> str:
     """Generate a professional resume in markdown format based on the provided details."""
     return f"```\n{query}\n```"  # Placeholder for actual resume generation logic
 
 class ResumeAgent:
-    def __init__(self):
-        self.llm = ChatOpenAI(model=MODEL_NAME, temperature=TEMPERATURE, api_key=OPENAI_API_KEY)
+    def __init__(self, llm: BaseChatModel = None):
+        # stream_usage makes token counts available even when the agent streams
+        self.llm = llm or ChatOpenAI(
+            model=MODEL_NAME, temperature=TEMPERATURE, api_key=OPENAI_API_KEY, stream_usage=True
+        )
         self.tools = [
             Tool(
                 name="generate_resume",
@@ -21,14 +28,23 @@ class ResumeAgent:
                 description="Generate a professional resume in markdown format based on the provided details"
             )
         ]
+        # Every request is laid out as system prompt, tool definitions, then the
+        # append-only history, so each turn's request starts with the previous
+        # one byte for byte and the provider's prompt cache can reuse it.
+        # The system prompt is a ready-made message rather than a template, so
+        # it is never re-rendered.
         self.prompt = ChatPromptTemplate(
             [
-                ("system", RESUME_PROMPT),
+                SystemMessage(content=RESUME_PROMPT),
                 MessagesPlaceholder("chat_history"),
                 ("human", "{input}"),
                 MessagesPlaceholder(variable_name="agent_scratchpad"),
             ]
         )
+        # Built once so the tool schemas are converted and bound a single time
+        self.agent = create_openai_functions_agent(
+            llm=self.llm, tools=self.tools, prompt=self.prompt
+        )
         # Store conversation memories by conversation_id
         self.conversation_memories = {}
 
@@ -43,8 +59,14 @@ class ResumeAgent:
             )
         return self.conversation_memories[conversation_id]
 
-    def process_message(self, user_input: str, conversation_id: str = None) -> str:
-        """Process the user's message and return the agent's response."""
+    def process_message(
+        self, user_input: str, conversation_id: str = None, usage: UsageTracker = None
+    ) -> str:
+        """
+        Process the user's message and return the agent's response.
+        If a UsageTracker is given, it collects token usage and wall time for the turn
+        through LangChain callbacks.
+        """
         # Use a default conversation_id if none provided
         if not conversation_id:
             conversation_id = "default"
@@ -52,17 +74,25 @@ class ResumeAgent:
         # Get or create memory for this conversation
         memory = self.get_or_create_memory(conversation_id)
         
-        # Create an agent with this conversation's memory
-        agent = create_openai_functions_agent(
-            llm=self.llm, tools=self.tools, prompt=self.prompt
-        )
-        
+        # Run the shared agent; history is passed in and saved by hand below
         agent_executor = AgentExecutor(
-            agent=agent, tools=self.tools, verbose=True, memory=memory
+            agent=self.agent, tools=self.tools, verbose=True, return_intermediate_steps=True
         )
         
         # Process the message using this conversation's agent
-        response = agent_executor.invoke({"input": user_input})
+        config = {"callbacks": [usage]} if usage else None
+        response = agent_executor.invoke(
+            {"input": user_input, "chat_history": memory.chat_memory.messages}, config=config
+        )
+
+        # Save the turn exactly as the model saw it, including any function
+        # call and result from the scratchpad. Saving only input and output
+        # would drop those and break the prefix after every tool-using turn.
+        memory.chat_memory.add_messages(
+            [HumanMessage(content=user_input)]
+            + format_to_openai_function_messages(response["intermediate_steps"])
+            + [AIMessage(content=response["output"])]
+        )
         return response["output"]
         
     def clear_memory(self, conversation_id: str):
@@ -0,0 +1,90 @@
+"""
+Compressed cold storage for idle conversations.
+Each archived conversation's messages are packed into one zlib-compressed
+BSON blob, kept either in MongoDB or as a file on local disk.
+"""
+import os
+import zlib
+from datetime import datetime
+from typing import List, Dict, Any
+
+import bson
+from bson import Binary
+
+from app.config import ARCHIVE_BACKEND
+
+ARCHIVE_COLLECTION = "archived_conversations"
+
+
+def pack_messages(messages: List[Dict[str, Any]]) -> bytes:
+    """Compress a conversation's messages into a single blob"""
+    # One blob per conversation lets the compressor share the repeated
+    # resume drafts between turns
+    return zlib.compress(bson.encode({"messages": messages}), 9)
+
+
+def unpack_messages(blob: bytes) -> List[Dict[str, Any]]:
+    """Inflate a blob produced by pack_messages"""
+    return bson.decode(zlib.decompress(blob))["messages"]
+
+
+class Archive:
+    """Storage for packed conversations, in MongoDB or on local disk"""
+    archive_dir: str = None
+    backend: str = ARCHIVE_BACKEND
+
+    @classmethod
+    def configure(cls, data_dir: str):
+        """Set the directory used by the disk backend"""
+        cls.archive_dir = os.path.join(data_dir, "archive")
+
+    @classmethod
+    def _path(cls, conversation_id: str) -> str:
+        return os.path.join(cls.archive_dir, f"{conversation_id}.bson.z")
+
+    @classmethod
+    async def save(cls, db, conversation_id: str, messages: List[Dict[str, Any]], archived_at: datetime):
+        """Store the packed messages, replacing any earlier archive of the conversation"""
+        blob = pack_messages(messages)
+        if cls.backend == "disk":
+            os.makedirs(cls.archive_dir, exist_ok=True)
+            tmp_path = cls._path(conversation_id) + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(blob)
+            os.replace(tmp_path, cls._path(conversation_id))
+        else:
+            await db[ARCHIVE_COLLECTION].replace_one(
+                {"_id": conversation_id},
+                {
+                    "_id": conversation_id,
+                    "blob": Binary(blob),
+                    "message_count": len(messages),
+                    "archived_at": archived_at
+                },
+                upsert=True
+            )
+
+    @classmethod
+    async def load(cls, db, conversation_id: str) -> List[Dict[str, Any]]:
+        """Return the archived messages of a conversation, or an empty list"""
+        if cls.backend == "disk":
+            path = cls._path(conversation_id)
+            if not os.path.exists(path):
+                return []
+            with open(path, 'rb') as f:
+                return unpack_messages(f.read())
+
+        document = await db[ARCHIVE_COLLECTION].find_one({"_id": conversation_id}, {"blob": 1})
+        if not document:
+            return []
+        return unpack_messages(document["blob"])
+
+    @classmethod
+    async def delete(cls, db, conversation_id: str):
+        """Remove a conversation's archive if there is one"""
+        if cls.backend == "disk":
+            path = cls._path(conversation_id)
+            if os.path.exists(path):
+                os.remove(path)
+        else:
+            await db[ARCHIVE_COLLECTION].delete_one({"_id": conversation_id})
@@ -11,6 +11,10 @@ OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 MODEL_NAME = os.environ.get("MODEL_NAME", "gpt-4o-mini")
 TEMPERATURE = float(os.environ.get("TEMPERATURE", "0"))
 
+# Per-conversation quotas, checked before calling the LLM (0 means unlimited)
+MAX_CONVERSATION_TOKENS = int(os.environ.get("MAX_CONVERSATION_TOKENS", "0"))
+MAX_CONVERSATION_TURNS = int(os.environ.get("MAX_CONVERSATION_TURNS", "0"))
+
 # Server settings
 HOST = os.environ.get("HOST", "127.0.0.1")
 PORT = int(os.environ.get("PORT", "8000"))
@@ -20,4 +24,17 @@ ALLOW_ORIGINS = os.environ.get("ALLOW_ORIGINS", "*").split(",")
 
 # MongoDB settings
 MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017")
-MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME", "resume_chat_app")
\ No newline at end of file
+MONGO_DB_NAME = os.environ.get("MONGO_DB_NAME", "resume_chat_app")
+MONGO_TIMEOUT_MS = int(os.environ.get("MONGO_TIMEOUT_MS", "5000"))
+# Seconds between background MongoDB health checks
+MONGO_HEALTHCHECK_INTERVAL = float(os.environ.get("MONGO_HEALTHCHECK_INTERVAL", "5"))
+
+# Archival settings
+# Conversations idle for this many days are packed into a compressed blob (0 disables)
+ARCHIVE_IDLE_DAYS = float(os.environ.get("ARCHIVE_IDLE_DAYS", "7"))
+# Where archived blobs live: "mongo" (archived_conversations collection) or "disk"
+ARCHIVE_BACKEND = os.environ.get("ARCHIVE_BACKEND", "mongo")
+# Delete archived conversations entirely after this many days (0 keeps them forever)
+ARCHIVE_TTL_DAYS = float(os.environ.get("ARCHIVE_TTL_DAYS", "0"))
+# Hours between archival runs
+ARCHIVE_INTERVAL_HOURS = float(os.environ.get("ARCHIVE_INTERVAL_HOURS", "6"))
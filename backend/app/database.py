@@ -2,21 +2,55 @@
 MongoDB database integration for chat application.
 Handles conversation storage and retrieval.
 """
-from datetime import datetime
-from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta
+from typing import List, Optional, Dict, Any, Set
+import asyncio
 import json
+import uuid
 import os
 import logging
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo import DESCENDING
+from pymongo.errors import ConnectionFailure
 from bson import ObjectId
 
-from app.config import MONGO_URI, MONGO_DB_NAME
+from app.config import (
+    MONGO_URI,
+    MONGO_DB_NAME,
+    MONGO_TIMEOUT_MS,
+    MONGO_HEALTHCHECK_INTERVAL,
+    ARCHIVE_IDLE_DAYS,
+    ARCHIVE_TTL_DAYS,
+    ARCHIVE_INTERVAL_HOURS,
+)
+from app.archive import Archive
+from app.usage import USAGE_FIELDS
+from app.events import (
+    EventBus,
+    CONVERSATION_CREATED,
+    CONVERSATION_UPDATED,
+    CONVERSATION_DELETED,
+    MESSAGE_ADDED,
+)
+from app.journal import (
+    Journal,
+    CREATE_CONVERSATION,
+    UPDATE_CONVERSATION_TITLE,
+    DELETE_CONVERSATION,
+    ADD_MESSAGE,
+    INCREMENT_USAGE,
+)
 
 # Collections
 CONVERSATIONS_COLLECTION = "conversations"
 MESSAGES_COLLECTION = "messages"
 
+# Recent usage op IDs kept on each conversation so a retried or replayed
+# counter update is applied once
+USAGE_OP_HISTORY = 100
+# Internal bookkeeping left out of conversation responses
+CONVERSATION_PROJECTION = {"usage_op_ids": 0}
+
 # Fallback file paths for local storage when MongoDB isn't available
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
 CONVERSATIONS_FILE = os.path.join(DATA_DIR, "conversations.json")
@@ -31,258 +65,806 @@ for file_path in [CONVERSATIONS_FILE, MESSAGES_FILE]:
         with open(file_path, 'w') as f:
             json.dump([], f)
 
+Journal.configure(DATA_DIR)
+Archive.configure(DATA_DIR)
+
+
+def _load(file_path: str) -> List[Dict[str, Any]]:
+    with open(file_path, 'r') as f:
+        return json.load(f)
+
+
+def _save(file_path: str, records: List[Dict[str, Any]]):
+    with open(file_path, 'w') as f:
+        json.dump(records, f, indent=2)
+
+
+def _parse_time(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+
+def _merge_messages(*batches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Combine archived and live messages, dropping duplicates left by an interrupted archive run"""
+    merged = {}
+    for batch in batches:
+        for message in batch:
+            merged[message["_id"]] = message
+    return sorted(merged.values(), key=lambda m: m["created_at"])
+
+
 class Database:
-    """Database class for MongoDB operations with fallback to local JSON files"""
+    """
+    Database class for MongoDB operations with fallback to local JSON files.
+    Writes made while MongoDB is unreachable go to the local files and a
+    write-behind journal, which is replayed once a health check succeeds.
+    """
     client: AsyncIOMotorClient = None
+    mongo_uri: str = MONGO_URI
     use_mongodb: bool = True
-    
+    # Whether MongoDB has been reachable at any point, so it may hold data
+    # that the local files don't know about
+    has_connected: bool = False
+    health_task: Optional[asyncio.Task] = None
+    archive_task: Optional[asyncio.Task] = None
+    # Pre-journal local conversations copied into MongoDB, with their messages,
+    # since the local store was last pruned
+    imported_ids: Set[str] = set()
+
     @classmethod
-    async def connect_to_mongo(cls, mongo_uri: str = MONGO_URI):
-        """Connect to MongoDB or set up local fallback"""
+    async def connect_to_mongo(cls, mongo_uri: str = MONGO_URI, reconcile: bool = False):
+        """
+        Connect to MongoDB or set up local fallback.
+        Only the API server passes reconcile=True: it owns the write-behind
+        journal, and tools like the viewer must never replay it concurrently.
+        """
+        cls.mongo_uri = mongo_uri
+        cls.use_mongodb = False
         try:
-            cls.client = AsyncIOMotorClient(mongo_uri, serverSelectionTimeoutMS=5000)
+            cls._create_client()
             # Test the connection
             await cls.client.admin.command('ping')
-            cls.use_mongodb = True
-            logging.info("Connected to MongoDB successfully")
         except Exception as e:
             logging.warning(f"Failed to connect to MongoDB: {e}. Using local JSON storage instead.")
-            cls.use_mongodb = False
-        
+            return
+
+        cls.has_connected = True
+        if not reconcile:
+            cls.use_mongodb = True
+            logging.info("Connected to MongoDB successfully")
+            return
+        try:
+            # Flush writes left over from an earlier outage before serving from MongoDB
+            await cls._reconcile()
+            logging.info("Connected to MongoDB successfully")
+        except Exception:
+            logging.exception("Connected to MongoDB but journal replay failed; using local JSON storage until it succeeds")
+
+    @classmethod
+    def _create_client(cls):
+        """
+        Build the Motor client. This can fail before any network I/O (for
+        example when an SRV record can't be resolved), so callers treat it
+        like a failed ping and retry later.
+        """
+        cls.client = None
+        cls.client = AsyncIOMotorClient(
+            cls.mongo_uri,
+            serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+            connectTimeoutMS=MONGO_TIMEOUT_MS,
+        )
+
     @classmethod
     async def close_mongo_connection(cls):
         """Close MongoDB connection"""
-        if cls.client and cls.use_mongodb:
+        await cls.stop_health_monitor()
+        await cls.stop_archiver()
+        if cls.client:
             cls.client.close()
-    
+
     @classmethod
     async def get_db(cls):
         """Get database instance"""
         if cls.use_mongodb:
             return cls.client[MONGO_DB_NAME]
         return None
-    
+
+    @classmethod
+    def start_health_monitor(cls, interval: float = MONGO_HEALTHCHECK_INTERVAL, reconcile: bool = False):
+        """
+        Start checking MongoDB in the background and switch back to it when it recovers.
+        With reconcile=True the journal is replayed first (API server only).
+        """
+        if cls.health_task is None or cls.health_task.done():
+            cls.health_task = asyncio.create_task(cls._health_monitor(interval, reconcile))
+
+    @classmethod
+    async def stop_health_monitor(cls):
+        """Stop the background health check"""
+        if cls.health_task:
+            cls.health_task.cancel()
+            try:
+                await cls.health_task
+            except asyncio.CancelledError:
+                pass
+            cls.health_task = None
+
+    @classmethod
+    async def _health_monitor(cls, interval: float, reconcile: bool):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                # The client may never have been built if the URI failed to resolve at boot
+                if cls.client is None:
+                    cls._create_client()
+                await cls.client.admin.command('ping')
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if cls.use_mongodb:
+                    cls._mark_unavailable(e)
+                continue
+            cls.has_connected = True
+            if not cls.use_mongodb and not reconcile:
+                cls.use_mongodb = True
+                logging.info("MongoDB is reachable again")
+            elif not cls.use_mongodb:
+                # Any failure is retried on the next tick; the loop must outlive it
+                try:
+                    await cls._reconcile()
+                    logging.info("MongoDB is reachable again; journal replayed")
+                except ConnectionFailure as e:
+                    logging.warning(f"MongoDB dropped during journal replay: {e}")
+                except Exception:
+                    logging.exception("Journal replay failed; staying on local storage")
+
+    @classmethod
+    def start_archiver(cls, interval_hours: float = ARCHIVE_INTERVAL_HOURS):
+        """Run the archival job periodically in the background"""
+        if ARCHIVE_IDLE_DAYS <= 0:
+            if ARCHIVE_TTL_DAYS > 0:
+                # TTL only applies to archived conversations, so it would never fire
+                logging.warning("ARCHIVE_TTL_DAYS has no effect while ARCHIVE_IDLE_DAYS is 0; archiver not started")
+            return
+        if cls.archive_task is None or cls.archive_task.done():
+            cls.archive_task = asyncio.create_task(cls._archiver(interval_hours * 3600))
+
+    @classmethod
+    async def stop_archiver(cls):
+        """Stop the background archival job"""
+        if cls.archive_task:
+            cls.archive_task.cancel()
+            try:
+                await cls.archive_task
+            except asyncio.CancelledError:
+                pass
+            cls.archive_task = None
+
+    @classmethod
+    async def _archiver(cls, interval: float):
+        while True:
+            try:
+                result = await cls.archive_idle_conversations()
+                logging.info(f"Archival run finished: {result}")
+            except Exception as e:
+                logging.error(f"Archival run failed: {e}")
+            await asyncio.sleep(interval)
+
+    @classmethod
+    async def archive_idle_conversations(
+        cls, idle_days: float = ARCHIVE_IDLE_DAYS, ttl_days: float = ARCHIVE_TTL_DAYS
+    ) -> Dict[str, int]:
+        """
+        Pack the messages of idle conversations into compressed archives and
+        optionally delete archived conversations older than ttl_days.
+        Only runs against MongoDB; the local JSON store is left as is.
+        """
+        result = {"archived": 0, "expired": 0}
+        if not cls.use_mongodb:
+            return result
+
+        db = await cls.get_db()
+        now = datetime.utcnow()
+
+        if idle_days > 0:
+            # Idle and either never archived or written to since the last run
+            cursor = db[CONVERSATIONS_COLLECTION].find(
+                {
+                    "updated_at": {"$lt": now - timedelta(days=idle_days)},
+                    "$or": [
+                        {"archived_at": {"$exists": False}},
+                        {"$expr": {"$gt": ["$updated_at", "$archived_at"]}}
+                    ]
+                },
+                {"_id": 1}
+            )
+            async for conversation in cursor:
+                conversation_id = str(conversation["_id"])
+                live = await db[MESSAGES_COLLECTION].find(
+                    {"conversation_id": conversation_id}
+                ).to_list(length=None)
+
+                if live:
+                    archived = await Archive.load(db, conversation_id)
+                    messages = _merge_messages(archived, live)
+                    await Archive.save(db, conversation_id, messages, now)
+                await db[CONVERSATIONS_COLLECTION].update_one(
+                    {"_id": conversation["_id"]},
+                    {"$set": {"archived_at": now}}
+                )
+                # Only remove what was packed; messages added meanwhile stay live
+                if live:
+                    await db[MESSAGES_COLLECTION].delete_many(
+                        {"_id": {"$in": [m["_id"] for m in live]}}
+                    )
+                result["archived"] += 1
+
+        if ttl_days > 0:
+            cursor = db[CONVERSATIONS_COLLECTION].find(
+                {
+                    "archived_at": {"$lt": now - timedelta(days=ttl_days)},
+                    "$expr": {"$lte": ["$updated_at", "$archived_at"]}
+                },
+                {"_id": 1}
+            )
+            expired = [str(c["_id"]) async for c in cursor]
+            for conversation_id in expired:
+                if await cls.delete_conversation(conversation_id):
+                    result["expired"] += 1
+
+        return result
+
+    @classmethod
+    def _mark_unavailable(cls, error: Exception):
+        """Switch to local storage until the health check sees MongoDB again"""
+        if cls.use_mongodb:
+            logging.warning(f"Lost connection to MongoDB: {error}. Buffering writes locally.")
+        cls.use_mongodb = False
+
+    @classmethod
+    async def _reconcile(cls):
+        """Replay the journal into MongoDB, then switch reads and writes back to it"""
+        while True:
+            entries = Journal.read()
+            if not entries:
+                # Nothing awaits between this check and the switch, so no local
+                # write can slip in un-replayed
+                cls._prune_local(Journal.replayed())
+                Journal.clear_replayed()
+                cls.use_mongodb = True
+                return
+            replayed = 0
+            failed = set()
+            try:
+                for entry in entries:
+                    try:
+                        await cls._replay(entry)
+                    except ConnectionFailure:
+                        raise
+                    except Exception as e:
+                        logging.error(f"Setting aside journal entry {entry.get('op_id')} that failed to replay: {e}")
+                        failed.add(entry.get("op_id"))
+                    replayed += 1
+            finally:
+                Journal.consume(replayed, failed)
+
+    @classmethod
+    def _prune_local(cls, replayed: List[Dict[str, Any]]):
+        """
+        Remove records that now live in MongoDB from the local files, so the
+        next outage starts from an empty buffer rather than stale copies.
+        Conversations that predate the journal are left alone unless a replay
+        imported them.
+        """
+        conversation_ids = {e["conversation_id"] for e in replayed if e["op"] == CREATE_CONVERSATION}
+        conversation_ids |= cls.imported_ids
+        cls.imported_ids = set()
+        message_ids = {e["message_id"] for e in replayed if e["op"] == ADD_MESSAGE}
+        if not conversation_ids and not message_ids:
+            return
+
+        conversations = _load(CONVERSATIONS_FILE)
+        kept = [c for c in conversations if c["_id"] not in conversation_ids]
+        if len(kept) != len(conversations):
+            _save(CONVERSATIONS_FILE, kept)
+
+        messages = _load(MESSAGES_FILE)
+        kept = [
+            m for m in messages
+            if m["_id"] not in message_ids and m["conversation_id"] not in conversation_ids
+        ]
+        if len(kept) != len(messages):
+            _save(MESSAGES_FILE, kept)
+
+    @classmethod
+    async def _replay_conversation_id(cls, conversation_id: str) -> Optional[str]:
+        """
+        Resolve a conversation ID for replay, importing conversations that only
+        exist locally together with the messages they already have.
+        """
+        if ObjectId.is_valid(conversation_id) or conversation_id in cls.imported_ids:
+            return Journal.resolve_id(conversation_id)
+        local = next((c for c in _load(CONVERSATIONS_FILE) if c["_id"] == conversation_id), None)
+        if local is None:
+            return Journal.resolve_id(conversation_id)
+
+        # Every upsert below is safe to repeat, so an import cut short by an
+        # outage is simply redone on the next replay
+        mongo_id = Journal.map_id(conversation_id)
+        db = cls.client[MONGO_DB_NAME]
+        await db[CONVERSATIONS_COLLECTION].update_one(
+            {"_id": ObjectId(mongo_id)},
+            {"$setOnInsert": {
+                "title": local["title"],
+                "created_at": _parse_time(local["created_at"]),
+                "updated_at": _parse_time(local["updated_at"])
+            }},
+            upsert=True
+        )
+        for message in _load(MESSAGES_FILE):
+            if message["conversation_id"] != conversation_id:
+                continue
+            # Message IDs share the map with conversation IDs, so keep them apart
+            message_id = message["_id"] if ObjectId.is_valid(message["_id"]) else f"message:{message['_id']}"
+            await db[MESSAGES_COLLECTION].update_one(
+                {"_id": ObjectId(Journal.map_id(message_id))},
+                {"$setOnInsert": {
+                    "conversation_id": mongo_id,
+                    "text": message["text"],
+                    "sender": message["sender"],
+                    "created_at": _parse_time(message["created_at"])
+                }},
+                upsert=True
+            )
+        cls.imported_ids.add(conversation_id)
+        return mongo_id
+
+    @classmethod
+    async def _replay(cls, entry: Dict[str, Any]):
+        """Apply one journal entry; every operation is safe to apply twice"""
+        db = cls.client[MONGO_DB_NAME]
+        op = entry["op"]
+
+        if op == CREATE_CONVERSATION:
+            mongo_id = Journal.map_id(entry["conversation_id"])
+            created_at = _parse_time(entry["created_at"])
+            await db[CONVERSATIONS_COLLECTION].update_one(
+                {"_id": ObjectId(mongo_id)},
+                {"$setOnInsert": {
+                    "title": entry["title"],
+                    "created_at": created_at,
+                    "updated_at": created_at
+                }},
+                upsert=True
+            )
+        elif op == UPDATE_CONVERSATION_TITLE:
+            mongo_id = await cls._replay_conversation_id(entry["conversation_id"])
+            if mongo_id:
+                await db[CONVERSATIONS_COLLECTION].update_one(
+                    {"_id": ObjectId(mongo_id)},
+                    {"$set": {"title": entry["title"]},
+                     "$max": {"updated_at": _parse_time(entry["updated_at"])}}
+                )
+        elif op == DELETE_CONVERSATION:
+            mongo_id = Journal.resolve_id(entry["conversation_id"])
+            if mongo_id:
+                await db[CONVERSATIONS_COLLECTION].delete_one({"_id": ObjectId(mongo_id)})
+                await db[MESSAGES_COLLECTION].delete_many({"conversation_id": mongo_id})
+                await Archive.delete(db, mongo_id)
+        elif op == ADD_MESSAGE:
+            mongo_id = await cls._replay_conversation_id(entry["conversation_id"])
+            if mongo_id:
+                created_at = _parse_time(entry["created_at"])
+                await db[MESSAGES_COLLECTION].update_one(
+                    {"_id": ObjectId(Journal.map_id(entry["message_id"]))},
+                    {"$setOnInsert": {
+                        "conversation_id": mongo_id,
+                        "text": entry["text"],
+                        "sender": entry["sender"],
+                        "created_at": created_at
+                    }},
+                    upsert=True
+                )
+                await db[CONVERSATIONS_COLLECTION].update_one(
+                    {"_id": ObjectId(mongo_id)},
+                    {"$max": {"updated_at": created_at}}
+                )
+        elif op == INCREMENT_USAGE:
+            mongo_id = await cls._replay_conversation_id(entry["conversation_id"])
+            if mongo_id:
+                await cls._increment_usage(db, mongo_id, entry["usage"], entry["op_id"])
+        else:
+            raise ValueError(f"Unknown journal operation: {op}")
+
     @classmethod
     async def create_conversation(cls, title: str) -> str:
         """Create a new conversation and return its ID"""
+        # IDs are generated up front so a write retried against the local
+        # store (and later replayed) keeps the same identity
+        new_id = str(ObjectId())
+        now = datetime.utcnow()
         if cls.use_mongodb:
-            db = await cls.get_db()
-            result = await db[CONVERSATIONS_COLLECTION].insert_one({
-                "title": title,
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            })
-            return str(result.inserted_id)
-        else:
+            try:
+                db = await cls.get_db()
+                await db[CONVERSATIONS_COLLECTION].insert_one({
+                    "_id": ObjectId(new_id),
+                    "title": title,
+                    "created_at": now,
+                    "updated_at": now
+                })
+            except ConnectionFailure as e:
+                cls._mark_unavailable(e)
+        if not cls.use_mongodb:
             # Local file fallback
-            with open(CONVERSATIONS_FILE, 'r') as f:
-                conversations = json.load(f)
-            
-            # Generate a simple ID
-            new_id = str(len(conversations) + 1)
-            new_conversation = {
+            conversations = _load(CONVERSATIONS_FILE)
+            conversations.append({
                 "_id": new_id,
                 "title": title,
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat()
-            }
-            
-            conversations.append(new_conversation)
-            
-            with open(CONVERSATIONS_FILE, 'w') as f:
-                json.dump(conversations, f, indent=2)
-            
-            return new_id
-    
+                "created_at": now.isoformat(),
+                "updated_at": now.isoformat()
+            })
+            _save(CONVERSATIONS_FILE, conversations)
+            Journal.append(CREATE_CONVERSATION, conversation_id=new_id, title=title, created_at=now.isoformat())
+
+        EventBus.publish(CONVERSATION_CREATED, conversation={
+            "_id": new_id,
+            "title": title,
+            "created_at": now.isoformat(),
+            "updated_at": now.isoformat()
+        })
+        return new_id
+
     @classmethod
     async def get_conversations(cls, limit: int = 20, skip: int = 0) -> List[Dict[str, Any]]:
         """Get list of conversations"""
         if cls.use_mongodb:
-            db = await cls.get_db()
-            cursor = db[CONVERSATIONS_COLLECTION].find().sort(
-                "updated_at", DESCENDING
-            ).skip(skip).limit(limit)
-            
-            conversations = []
-            async for document in cursor:
-                document["_id"] = str(document["_id"])
-                conversations.append(document)
-            
-            return conversations
-        else:
-            # Local file fallback
-            with open(CONVERSATIONS_FILE, 'r') as f:
-                conversations = json.load(f)
-            
-            # Sort by updated_at in descending order
-            conversations.sort(key=lambda x: x["updated_at"], reverse=True)
-            
-            return conversations[skip:skip+limit]
-    
+            try:
+                db = await cls.get_db()
+                cursor = db[CONVERSATIONS_COLLECTION].find({}, CONVERSATION_PROJECTION).sort(
+                    "updated_at", DESCENDING
+                ).skip(skip).limit(limit)
+
+                conversations = []
+                async for document in cursor:
+                    document["_id"] = str(document["_id"])
+                    conversations.append(document)
+
+                return conversations
+            except ConnectionFailure as e:
+                cls._mark_unavailable(e)
+
+        # Local file fallback
+        conversations = _load(CONVERSATIONS_FILE)
+
+        # Sort by updated_at in descending order
+        conversations.sort(key=lambda x: x["updated_at"], reverse=True)
+
+        return conversations[skip:skip+limit]
+
     @classmethod
     async def get_conversation(cls, conversation_id: str) -> Optional[Dict[str, Any]]:
         """Get a conversation by ID"""
         if cls.use_mongodb:
-            db = await cls.get_db()
-            conversation = await db[CONVERSATIONS_COLLECTION].find_one({"_id": ObjectId(conversation_id)})
-            
-            if conversation:
-                conversation["_id"] = str(conversation["_id"])
-                return conversation
-            return None
-        else:
-            # Local file fallback
-            with open(CONVERSATIONS_FILE, 'r') as f:
-                conversations = json.load(f)
-            
-            for conversation in conversations:
-                if conversation["_id"] == conversation_id:
+            mongo_id = Journal.resolve_id(conversation_id)
+            if not mongo_id:
+                return None
+            try:
+                db = await cls.get_db()
+                conversation = await db[CONVERSATIONS_COLLECTION].find_one({"_id": ObjectId(mongo_id)}, CONVERSATION_PROJECTION)
+
+                if conversation:
+                    conversation["_id"] = str(conversation["_id"])
                     return conversation
-            
-            return None
-    
+                return None
+            except ConnectionFailure as e:
+                cls._mark_unavailable(e)
+
+        # Local file fallback
+        for conversation in _load(CONVERSATIONS_FILE):
+            if conversation["_id"] == conversation_id:
+                return conversation
+
+        return None
+
     @classmethod
     async def update_conversation_title(cls, conversation_id: str, title: str) -> bool:
         """Update conversation title"""
+        now = datetime.utcnow()
+        updated = False
         if cls.use_mongodb:
-            db = await cls.get_db()
-            result = await db[CONVERSATIONS_COLLECTION].update_one(
-                {"_id": ObjectId(conversation_id)},
-                {"$set": {"title": title, "updated_at": datetime.utcnow()}}
-            )
-            return result.modified_count > 0
-        else:
+            mongo_id = Journal.resolve_id(conversation_id)
+            if not mongo_id:
+                return False
+            try:
+                db = await cls.get_db()
+                result = await db[CONVERSATIONS_COLLECTION].update_one(
+                    {"_id": ObjectId(mongo_id)},
+                    {"$set": {"title": title, "updated_at": now}}
+                )
+                updated = result.modified_count > 0
+            except ConnectionFailure as e:
+                cls._mark_unavailable(e)
+        if not cls.use_mongodb:
             # Local file fallback
-            with open(CONVERSATIONS_FILE, 'r') as f:
-                conversations = json.load(f)
-            
+            conversations = _load(CONVERSATIONS_FILE)
             for conversation in conversations:
                 if conversation["_id"] == conversation_id:
                     conversation["title"] = title
-                    conversation["updated_at"] = datetime.utcnow().isoformat()
-                    
-                    with open(CONVERSATIONS_FILE, 'w') as f:
-                        json.dump(conversations, f, indent=2)
-                    
-                    return True
-            
-            return False
-    
+                    conversation["updated_at"] = now.isoformat()
+                    _save(CONVERSATIONS_FILE, conversations)
+                    updated = True
+                    break
+
+            # The conversation may only exist in MongoDB, so keep the change for replay
+            if updated or cls.has_connected:
+                Journal.append(
+                    UPDATE_CONVERSATION_TITLE,
+                    conversation_id=conversation_id,
+                    title=title,
+                    updated_at=now.isoformat()
+                )
+                updated = True
+
+        if updated:
+            EventBus.publish(
+                CONVERSATION_UPDATED,
+                conversation_id=conversation_id,
+                title=title,
+                updated_at=now.isoformat()
+            )
+        return updated
+
     @classmethod
     async def delete_conversation(cls, conversation_id: str) -> bool:
         """Delete a conversation and its messages"""
+        deleted = False
         if cls.use_mongodb:
-            db = await cls.get_db()
-            
-            # Delete the conversation
-            result = await db[CONVERSATIONS_COLLECTION].delete_one({"_id": ObjectId(conversation_id)})
-            
-            # Delete all messages in the conversation
-            await db[MESSAGES_COLLECTION].delete_many({"conversation_id": conversation_id})
-            
-            return result.deleted_count > 0
-        else:
+            mongo_id = Journal.resolve_id(conversation_id)
+            if not mongo_id:
+                return False
+            try:
+                db = await cls.get_db()
+
+                # Delete the conversation
+                result = await db[CONVERSATIONS_COLLECTION].delete_one({"_id": ObjectId(mongo_id)})
+
+                # Delete all messages in the conversation, live and archived
+                await db[MESSAGES_COLLECTION].delete_many({"conversation_id": mongo_id})
+                await Archive.delete(db, mongo_id)
+
+                deleted = result.deleted_count > 0
+            except ConnectionFailure as e:
+                cls._mark_unavailable(e)
+        if not cls.use_mongodb:
             # Local file fallback
-            with open(CONVERSATIONS_FILE, 'r') as f:
-                conversations = json.load(f)
-            
+            conversations = _load(CONVERSATIONS_FILE)
             initial_count = len(conversations)
             conversations = [c for c in conversations if c["_id"] != conversation_id]
-            
-            with open(CONVERSATIONS_FILE, 'w') as f:
-                json.dump(conversations, f, indent=2)
-            
+            _save(CONVERSATIONS_FILE, conversations)
+
             # Delete associated messages
-            with open(MESSAGES_FILE, 'r') as f:
-                messages = json.load(f)
-            
+            messages = _load(MESSAGES_FILE)
             messages = [m for m in messages if m["conversation_id"] != conversation_id]
-            
-            with open(MESSAGES_FILE, 'w') as f:
-                json.dump(messages, f, indent=2)
-            
-            return len(conversations) < initial_count
-    
+            _save(MESSAGES_FILE, messages)
+
+            deleted = len(conversations) < initial_count
+            # The conversation may only exist in MongoDB, so keep the delete for replay
+            if deleted or cls.has_connected:
+                Journal.append(DELETE_CONVERSATION, conversation_id=conversation_id)
+                deleted = True
+
+        if deleted:
+            EventBus.publish(CONVERSATION_DELETED, conversation_id=conversation_id)
+        return deleted
+
     @classmethod
-    async def add_message(cls, conversation_id: str, text: str, sender: str) -> str:
-        """Add a message to a conversation"""
+    async def _increment_usage(
+        cls, db, mongo_id: str, usage: Dict[str, int], op_id: str, updated_at: Optional[datetime] = None
+    ):
+        """Add usage counters to a conversation unless op_id has already been applied"""
+        update = {
+            "$inc": {f"usage.{k}": v for k, v in usage.items()},
+            "$push": {"usage_op_ids": {"$each": [op_id], "$slice": -USAGE_OP_HISTORY}}
+        }
+        if updated_at:
+            update["$set"] = {"updated_at": updated_at}
+        await db[CONVERSATIONS_COLLECTION].update_one(
+            {"_id": ObjectId(mongo_id), "usage_op_ids": {"$ne": op_id}},
+            update
+        )
+
+    @classmethod
+    def _increment_local_usage(
+        cls, conversation_id: str, usage: Optional[Dict[str, int]], updated_at: Optional[datetime] = None
+    ):
+        conversations = _load(CONVERSATIONS_FILE)
+        for conversation in conversations:
+            if conversation["_id"] == conversation_id:
+                if updated_at:
+                    conversation["updated_at"] = updated_at.isoformat()
+                if usage:
+                    totals = conversation.setdefault("usage", {})
+                    for key, value in usage.items():
+                        totals[key] = totals.get(key, 0) + value
+                _save(CONVERSATIONS_FILE, conversations)
+                break
+
+    @classmethod
+    async def record_usage(cls, conversation_id: str, usage: Dict[str, int]):
+        """Add a turn's usage counters to a conversation without adding a message"""
+        op_id = uuid.uuid4().hex
         if cls.use_mongodb:
-            db = await cls.get_db()
-            
-            # Update conversation's updated_at timestamp
-            await db[CONVERSATIONS_COLLECTION].update_one(
-                {"_id": ObjectId(conversation_id)},
-                {"$set": {"updated_at": datetime.utcnow()}}
-            )
-            
-            # Insert the message
-            result = await db[MESSAGES_COLLECTION].insert_one({
-                "conversation_id": conversation_id,
-                "text": text,
-                "sender": sender,
-                "created_at": datetime.utcnow()
-            })
-            
-            return str(result.inserted_id)
-        else:
+            mongo_id = Journal.resolve_id(conversation_id)
+            if not mongo_id:
+                return
+            try:
+                db = await cls.get_db()
+                await cls._increment_usage(db, mongo_id, usage, op_id)
+                return
+            except ConnectionFailure as e:
+                cls._mark_unavailable(e)
+
+        # Local file fallback
+        cls._increment_local_usage(conversation_id, usage)
+        Journal.append(INCREMENT_USAGE, op_id=op_id, conversation_id=conversation_id, usage=usage)
+
+    @classmethod
+    async def add_message(
+        cls, conversation_id: str, text: str, sender: str, usage: Optional[Dict[str, int]] = None
+    ) -> str:
+        """
+        Add a message to a conversation.
+        usage holds counters (see app.usage.USAGE_FIELDS) added to the conversation's totals.
+        """
+        new_id = str(ObjectId())
+        # The counter update has its own ID so it is applied once however often it is retried
+        usage_op_id = uuid.uuid4().hex
+        now = datetime.utcnow()
+        if cls.use_mongodb:
+            try:
+                db = await cls.get_db()
+                mongo_id = Journal.resolve_id(conversation_id) or conversation_id
+
+                # Insert the message
+                await db[MESSAGES_COLLECTION].insert_one({
+                    "_id": ObjectId(new_id),
+                    "conversation_id": mongo_id,
+                    "text": text,
+                    "sender": sender,
+                    "created_at": now
+                })
+
+                # Update conversation's updated_at timestamp and usage totals in one atomic write
+                if ObjectId.is_valid(mongo_id):
+                    if usage:
+                        await cls._increment_usage(db, mongo_id, usage, usage_op_id, updated_at=now)
+                    else:
+                        await db[CONVERSATIONS_COLLECTION].update_one(
+                            {"_id": ObjectId(mongo_id)},
+                            {"$set": {"updated_at": now}}
+                        )
+            except ConnectionFailure as e:
+                cls._mark_unavailable(e)
+        if not cls.use_mongodb:
             # Local file fallback
-            # Update conversation's updated_at timestamp
-            with open(CONVERSATIONS_FILE, 'r') as f:
-                conversations = json.load(f)
-            
-            for conversation in conversations:
-                if conversation["_id"] == conversation_id:
-                    conversation["updated_at"] = datetime.utcnow().isoformat()
-                    
-                    with open(CONVERSATIONS_FILE, 'w') as f:
-                        json.dump(conversations, f, indent=2)
-                    
-                    break
-            
+            # Update conversation's updated_at timestamp and usage totals
+            cls._increment_local_usage(conversation_id, usage, updated_at=now)
+
             # Add the message
-            with open(MESSAGES_FILE, 'r') as f:
-                messages = json.load(f)
-            
-            new_id = str(len(messages) + 1)
-            new_message = {
+            messages = _load(MESSAGES_FILE)
+            messages.append({
                 "_id": new_id,
                 "conversation_id": conversation_id,
                 "text": text,
                 "sender": sender,
-                "created_at": datetime.utcnow().isoformat()
-            }
-            
-            messages.append(new_message)
-            
-            with open(MESSAGES_FILE, 'w') as f:
-                json.dump(messages, f, indent=2)
-            
-            return new_id
-    
+                "created_at": now.isoformat()
+            })
+            _save(MESSAGES_FILE, messages)
+            Journal.append(
+                ADD_MESSAGE,
+                conversation_id=conversation_id,
+                message_id=new_id,
+                text=text,
+                sender=sender,
+                created_at=now.isoformat()
+            )
+            # Journaled on its own so replay can guard it by op_id,
+            # independently of whether the message had already landed
+            if usage:
+                Journal.append(INCREMENT_USAGE, op_id=usage_op_id, conversation_id=conversation_id, usage=usage)
+
+        EventBus.publish(MESSAGE_ADDED, conversation_id=conversation_id, message={
+            "_id": new_id,
+            "conversation_id": conversation_id,
+            "text": text,
+            "sender": sender,
+            "created_at": now.isoformat()
+        })
+        return new_id
+
     @classmethod
     async def get_messages(cls, conversation_id: str) -> List[Dict[str, Any]]:
-        """Get all messages in a conversation"""
+        """Get all messages in a conversation, inflating archived ones transparently"""
         if cls.use_mongodb:
-            db = await cls.get_db()
-            cursor = db[MESSAGES_COLLECTION].find(
-                {"conversation_id": conversation_id}
-            ).sort("created_at", 1)  # Ascending order by creation time
-            
-            messages = []
-            async for document in cursor:
-                document["_id"] = str(document["_id"])
-                messages.append(document)
-            
-            return messages
-        else:
-            # Local file fallback
-            with open(MESSAGES_FILE, 'r') as f:
-                all_messages = json.load(f)
-            
-            # Filter messages for this conversation
-            conversation_messages = [m for m in all_messages if m["conversation_id"] == conversation_id]
-            
-            # Sort by created_at
-            conversation_messages.sort(key=lambda x: x["created_at"])
-            
-            return conversation_messages
+            try:
+                db = await cls.get_db()
+                mongo_id = Journal.resolve_id(conversation_id) or conversation_id
+                cursor = db[MESSAGES_COLLECTION].find(
+                    {"conversation_id": mongo_id}
+                ).sort("created_at", 1)  # Ascending order by creation time
+
+                # Only conversations marked archived touch the archive store;
+                # the marker lookup runs alongside the messages query
+                if ObjectId.is_valid(mongo_id):
+                    messages, conversation = await asyncio.gather(
+                        cursor.to_list(length=None),
+                        db[CONVERSATIONS_COLLECTION].find_one(
+                            {"_id": ObjectId(mongo_id)}, {"archived_at": 1}
+                        )
+                    )
+                else:
+                    messages, conversation = await cursor.to_list(length=None), None
+                if conversation and conversation.get("archived_at"):
+                    archived = await Archive.load(db, mongo_id)
+                    messages = _merge_messages(archived, messages)
+
+                for document in messages:
+                    document["_id"] = str(document["_id"])
+
+                return messages
+            except ConnectionFailure as e:
+                cls._mark_unavailable(e)
+
+        # Local file fallback
+        all_messages = _load(MESSAGES_FILE)
+
+        # Filter messages for this conversation
+        conversation_messages = [m for m in all_messages if m["conversation_id"] == conversation_id]
+
+        # Sort by created_at
+        conversation_messages.sort(key=lambda x: x["created_at"])
+
+        return conversation_messages
+
+    @classmethod
+    async def get_usage_report(cls, limit: int = 10) -> Dict[str, Any]:
+        """Get usage totals across all conversations and the most expensive ones"""
+        if cls.use_mongodb:
+            try:
+                db = await cls.get_db()
+                totals = await db[CONVERSATIONS_COLLECTION].aggregate([
+                    {"$group": {
+                        "_id": None,
+                        "conversations": {"$sum": 1},
+                        **{field: {"$sum": {"$ifNull": [f"$usage.{field}", 0]}} for field in USAGE_FIELDS}
+                    }},
+                    {"$project": {"_id": 0}}
+                ]).to_list(length=1)
+
+                cursor = db[CONVERSATIONS_COLLECTION].find(
+                    {"usage.total_tokens": {"$gt": 0}},
+                    {"title": 1, "usage": 1, "updated_at": 1}
+                ).sort("usage.total_tokens", DESCENDING).limit(limit)
+                top = []
+                async for document in cursor:
+                    document["_id"] = str(document["_id"])
+                    top.append(document)
+
+                empty = {"conversations": 0, **{field: 0 for field in USAGE_FIELDS}}
+                return {"totals": totals[0] if totals else empty, "top_conversations": top}
+            except ConnectionFailure as e:
+                cls._mark_unavailable(e)
+
+        # Local file fallback
+        conversations = _load(CONVERSATIONS_FILE)
+        totals = {"conversations": len(conversations), **{field: 0 for field in USAGE_FIELDS}}
+        for conversation in conversations:
+            for field in USAGE_FIELDS:
+                totals[field] += conversation.get("usage", {}).get(field, 0)
+
+        top = [c for c in conversations if c.get("usage", {}).get("total_tokens", 0) > 0]
+        top.sort(key=lambda c: c["usage"]["total_tokens"], reverse=True)
+        top = [
+            {"_id": c["_id"], "title": c["title"], "usage": c["usage"], "updated_at": c["updated_at"]}
+            for c in top[:limit]
+        ]
+        return {"totals": totals, "top_conversations": top}
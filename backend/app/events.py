@@ -0,0 +1,77 @@
+"""
+In-process publish/subscribe for conversation change events.
+Database write methods publish deltas here and the /ws endpoint fans them out
+to connected clients.
+"""
+import asyncio
+import logging
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Set
+
+# Event types pushed to clients
+CONVERSATION_CREATED = "conversation_created"
+CONVERSATION_UPDATED = "conversation_updated"
+CONVERSATION_DELETED = "conversation_deleted"
+MESSAGE_ADDED = "message_added"
+# Sent to a subscriber that fell behind and lost events; it should refetch
+RESYNC = "resync"
+
+# Maximum number of undelivered events buffered per subscriber
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# Client ID of the request currently being handled, attached to published
+# events so the originating tab can skip changes it already applied locally
+current_origin: ContextVar[Optional[str]] = ContextVar("current_origin", default=None)
+
+
+class Subscription:
+    """A single subscriber's queue of pending events"""
+
+    def __init__(self, client_id: Optional[str] = None):
+        self.client_id = client_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.overflowed = False
+
+    async def get(self) -> Dict[str, Any]:
+        """Wait for the next event, or a resync notice if events were dropped"""
+        event = await self.queue.get()
+        if self.overflowed:
+            # Anything still queued is a partial view; tell the client to refetch
+            self.overflowed = False
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return {"type": RESYNC}
+        return event
+
+
+class EventBus:
+    """
+    Process-local event fan-out.
+    Publishers only depend on publish(), so the source can later be swapped for
+    a MongoDB change stream watcher that calls publish() for each change.
+    """
+    subscribers: Set[Subscription] = set()
+
+    @classmethod
+    def subscribe(cls, client_id: Optional[str] = None) -> Subscription:
+        """Register a new subscriber"""
+        subscription = Subscription(client_id)
+        cls.subscribers.add(subscription)
+        return subscription
+
+    @classmethod
+    def unsubscribe(cls, subscription: Subscription):
+        """Remove a subscriber"""
+        cls.subscribers.discard(subscription)
+
+    @classmethod
+    def publish(cls, event_type: str, **payload: Any):
+        """Deliver an event to every subscriber without blocking the publisher"""
+        event = {"type": event_type, "origin": current_origin.get(), **payload}
+        for subscription in list(cls.subscribers):
+            try:
+                subscription.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                if not subscription.overflowed:
+                    logging.warning("Event subscriber fell behind; requesting resync")
+                subscription.overflowed = True
@@ -0,0 +1,159 @@
+"""
+Write-behind journal for writes made while MongoDB is unavailable.
+Writes served from the local JSON store are appended here and replayed into
+MongoDB once it is reachable again.
+"""
+import json
+import logging
+import os
+import uuid
+from typing import List, Dict, Any, Optional, Set
+
+from bson import ObjectId
+
+# Journal operations
+CREATE_CONVERSATION = "create_conversation"
+UPDATE_CONVERSATION_TITLE = "update_conversation_title"
+DELETE_CONVERSATION = "delete_conversation"
+ADD_MESSAGE = "add_message"
+INCREMENT_USAGE = "increment_usage"
+
+
+class Journal:
+    """Append-only log of pending MongoDB writes plus the local-to-Mongo ID map"""
+    journal_file: str = None
+    replayed_file: str = None
+    id_map_file: str = None
+
+    @classmethod
+    def configure(cls, data_dir: str):
+        """Set the files used for the journal and ID map"""
+        cls.journal_file = os.path.join(data_dir, "journal.jsonl")
+        cls.replayed_file = os.path.join(data_dir, "journal.replayed.jsonl")
+        cls.id_map_file = os.path.join(data_dir, "id_map.json")
+
+    @classmethod
+    def append(cls, op: str, op_id: Optional[str] = None, **fields: Any):
+        """Record a write that still has to reach MongoDB"""
+        entry = {"op_id": op_id or uuid.uuid4().hex, "op": op, **fields}
+        with open(cls.journal_file, 'a+') as f:
+            # Terminate a line torn by an earlier crash so this entry stays parseable
+            if f.tell() > 0:
+                f.seek(f.tell() - 1)
+                if f.read(1) != "\n":
+                    f.write("\n")
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    @classmethod
+    def read(cls) -> List[Dict[str, Any]]:
+        """Return all pending entries in the order they were written"""
+        if not os.path.exists(cls.journal_file):
+            return []
+        with open(cls.journal_file, 'r') as f:
+            lines = [line for line in f if line.strip()]
+
+        entries = []
+        torn = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                # A crash mid-append leaves a torn line; the write it belonged
+                # to was never acknowledged, so set it aside instead of failing
+                torn.append(line)
+        if torn:
+            cls._quarantine(torn, entries)
+        return entries
+
+    @classmethod
+    def _quarantine(cls, torn: List[str], entries: List[Dict[str, Any]]):
+        """Move unparseable lines to journal.jsonl.corrupt and keep the rest"""
+        logging.warning(f"Setting aside {len(torn)} torn write-behind journal line(s)")
+        with open(cls.journal_file + ".corrupt", 'a') as f:
+            for line in torn:
+                f.write(line.rstrip("\n") + "\n")
+        cls._rewrite(entries)
+
+    @classmethod
+    def _rewrite(cls, entries: List[Dict[str, Any]]):
+        tmp_file = cls.journal_file + ".tmp"
+        with open(tmp_file, 'w') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_file, cls.journal_file)
+
+    @classmethod
+    def consume(cls, count: int, failed_op_ids: Set[str] = frozenset()):
+        """
+        Drop the first count entries once they have been replayed.
+        They are kept aside until the local store has been pruned of them;
+        entries listed in failed_op_ids never reached MongoDB and go to
+        journal.jsonl.corrupt instead.
+        """
+        entries = cls.read()
+        done = entries[:count]
+        failed = [e for e in done if e["op_id"] in failed_op_ids]
+        if failed:
+            with open(cls.journal_file + ".corrupt", 'a') as f:
+                for entry in failed:
+                    f.write(json.dumps(entry) + "\n")
+        with open(cls.replayed_file, 'a') as f:
+            for entry in done:
+                if entry["op_id"] not in failed_op_ids:
+                    f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        cls._rewrite(entries[count:])
+
+    @classmethod
+    def replayed(cls) -> List[Dict[str, Any]]:
+        """Return entries that reached MongoDB but are still in the local store"""
+        if not os.path.exists(cls.replayed_file):
+            return []
+        with open(cls.replayed_file, 'r') as f:
+            entries = []
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    continue
+            return entries
+
+    @classmethod
+    def clear_replayed(cls):
+        """Forget replayed entries once the local store no longer holds them"""
+        if os.path.exists(cls.replayed_file):
+            os.remove(cls.replayed_file)
+
+    @classmethod
+    def _load_id_map(cls) -> Dict[str, str]:
+        if not os.path.exists(cls.id_map_file):
+            return {}
+        with open(cls.id_map_file, 'r') as f:
+            return json.load(f)
+
+    @classmethod
+    def resolve_id(cls, local_id: str) -> Optional[str]:
+        """
+        Translate an ID into its MongoDB form.
+        Local IDs are ObjectId strings already; older numeric IDs from the JSON
+        store are looked up in the ID map and return None when unmapped.
+        """
+        if ObjectId.is_valid(local_id):
+            return local_id
+        return cls._load_id_map().get(local_id)
+
+    @classmethod
+    def map_id(cls, local_id: str) -> str:
+        """Return the MongoDB ID for local_id, allocating and persisting one if needed"""
+        mongo_id = cls.resolve_id(local_id)
+        if mongo_id:
+            return mongo_id
+        id_map = cls._load_id_map()
+        mongo_id = str(ObjectId())
+        id_map[local_id] = mongo_id
+        with open(cls.id_map_file, 'w') as f:
+            json.dump(id_map, f, indent=2)
+        return mongo_id
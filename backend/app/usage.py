@@ -0,0 +1,94 @@
+"""
+Token and latency accounting for conversation turns.
+"""
+import time
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from app.config import MAX_CONVERSATION_TOKENS, MAX_CONVERSATION_TURNS
+
+# Counters kept under "usage" on each conversation document
+# cached_prompt_tokens is the part of prompt_tokens served from the provider's
+# prompt cache; the rest of prompt_tokens was processed uncached
+USAGE_FIELDS = (
+    "prompt_tokens",
+    "cached_prompt_tokens",
+    "completion_tokens",
+    "total_tokens",
+    "turns",
+    "latency_ms",
+)
+
+
+class UsageTracker(BaseCallbackHandler):
+    """Callback handler that adds up token usage across the LLM calls of one turn"""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.completion_tokens = 0
+        self.total_tokens = 0
+        self.started_at: Optional[float] = None
+        self.latency_ms = 0
+
+    def on_chain_start(
+        self, serialized: Dict[str, Any], inputs: Dict[str, Any], *, parent_run_id: Optional[UUID] = None, **kwargs: Any
+    ) -> None:
+        # The root run is the whole turn; nested chains belong to it
+        if parent_run_id is None:
+            self.started_at = time.perf_counter()
+
+    def on_chain_end(self, outputs: Dict[str, Any], *, parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        if parent_run_id is None:
+            self._stop()
+
+    def on_chain_error(self, error: BaseException, *, parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        if parent_run_id is None:
+            self._stop()
+
+    def _stop(self):
+        if self.started_at is not None:
+            self.latency_ms = int((time.perf_counter() - self.started_at) * 1000)
+
+    def on_llm_end(self, response: LLMResult, **kwargs: Any) -> None:
+        # Chat models report usage on the message; older integrations only in llm_output
+        found = False
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.prompt_tokens += usage.get("input_tokens", 0)
+                    self.cached_prompt_tokens += (usage.get("input_token_details") or {}).get("cache_read", 0)
+                    self.completion_tokens += usage.get("output_tokens", 0)
+                    self.total_tokens += usage.get("total_tokens", 0)
+                    found = True
+        if not found and response.llm_output:
+            usage = response.llm_output.get("token_usage") or {}
+            self.prompt_tokens += usage.get("prompt_tokens", 0)
+            self.cached_prompt_tokens += (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+            self.completion_tokens += usage.get("completion_tokens", 0)
+            self.total_tokens += usage.get("total_tokens", 0)
+
+    def as_increment(self) -> Dict[str, int]:
+        """Counters to add to the conversation for this turn"""
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "cached_prompt_tokens": self.cached_prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+            "turns": 1,
+            "latency_ms": self.latency_ms,
+        }
+
+
+def quota_exceeded(usage: Optional[Dict[str, int]]) -> Optional[str]:
+    """Return why a conversation is over its quota, or None if it may continue"""
+    usage = usage or {}
+    if MAX_CONVERSATION_TOKENS and usage.get("total_tokens", 0) >= MAX_CONVERSATION_TOKENS:
+        return f"Conversation has used its limit of {MAX_CONVERSATION_TOKENS} tokens"
+    if MAX_CONVERSATION_TURNS and usage.get("turns", 0) >= MAX_CONVERSATION_TURNS:
+        return f"Conversation has reached its limit of {MAX_CONVERSATION_TURNS} turns"
+    return None
@@ -0,0 +1,18 @@
+import asyncio
+from app.database import Database
+
+async def archive_conversations():
+    try:
+        await Database.connect_to_mongo()
+
+        if not Database.use_mongodb:
+            print("❌ MongoDB is not available; nothing to archive.")
+            return
+
+        result = await Database.archive_idle_conversations()
+        print(f"✅ Archived {result['archived']} conversation(s), expired {result['expired']}.")
+    finally:
+        await Database.close_mongo_connection()
+
+if __name__ == "__main__":
+    asyncio.run(archive_conversations())
@@ -0,0 +1,128 @@
+"""
+Checks that ResumeAgent sends a byte-stable prompt prefix from turn to turn.
+
+Runs a multi-turn conversation against a local stub model that serializes each
+request the way a provider would (tool definitions, then messages, including
+function calls and results) and reports the part shared with the previous
+request as cached prompt tokens. Every other turn asks for the resume, so the
+stub calls the generate_resume tool before answering.
+"""
+import json
+import sys
+import time
+from typing import Any, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.agent import ResumeAgent
+from app.usage import UsageTracker
+
+TURNS = 20
+# Turns whose input contains this phrase make the stub call generate_resume first
+TOOL_TRIGGER = "generate my resume"
+# Rough characters-per-token ratio used to express the stub's byte counts as tokens
+CHARS_PER_TOKEN = 4
+
+
+class PrefixCacheStub(BaseChatModel):
+    """Chat model stub that reports how much of each request repeats the previous one"""
+    previous_request: str = ""
+    requests: List[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "prefix-cache-stub"
+
+    def _serialize(self, messages: List[BaseMessage], functions: Optional[list]) -> str:
+        parts = [json.dumps({"functions": functions or []}, sort_keys=True)]
+        for message in messages:
+            parts.append(json.dumps({
+                "role": message.type,
+                "content": message.content,
+                "name": getattr(message, "name", None),
+                "function_call": message.additional_kwargs.get("function_call"),
+            }, sort_keys=True))
+        return "\n".join(parts)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        request = self._serialize(messages, kwargs.get("functions"))
+        prefix = 0
+        for a, b in zip(self.previous_request, request):
+            if a != b:
+                break
+            prefix += 1
+        self.previous_request = request
+        self.requests.append(request)
+
+        last = messages[-1]
+        additional_kwargs = {}
+        if isinstance(last, HumanMessage) and TOOL_TRIGGER in last.content:
+            reply = ""
+            additional_kwargs["function_call"] = {
+                "name": "generate_resume",
+                "arguments": json.dumps({"__arg1": f"# Resume draft {len(self.requests)}"}),
+            }
+        else:
+            reply = f"Thanks, noted detail #{len(self.requests)}."
+        prompt_tokens = len(request) // CHARS_PER_TOKEN
+        completion_tokens = (len(reply) + len(json.dumps(additional_kwargs))) // CHARS_PER_TOKEN
+        message = AIMessage(
+            content=reply,
+            additional_kwargs=additional_kwargs,
+            usage_metadata={
+                "input_tokens": prompt_tokens,
+                "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "input_token_details": {"cache_read": prefix // CHARS_PER_TOKEN},
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def run_benchmark(turns: int = TURNS) -> bool:
+    stub = PrefixCacheStub()
+    agent = ResumeAgent(llm=stub)
+    all_stable = True
+
+    print(f"{'turn':>4} {'calls':>5} {'prompt':>8} {'cached':>8} {'hit':>6} {'ms':>6}  extends previous")
+    for turn in range(1, turns + 1):
+        usage = UsageTracker()
+        first_request = len(stub.requests)
+        text = f"My detail number {turn} is {{value {turn}}}."
+        if turn % 2 == 0:
+            text += f" Please {TOOL_TRIGGER}."
+        started = time.perf_counter()
+        agent.process_message(text, "benchmark", usage)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        # Every request of this turn, including the first one after a
+        # tool-using turn, must start with the whole request before it
+        stable = all(
+            stub.requests[i].startswith(stub.requests[i - 1])
+            for i in range(max(first_request, 1), len(stub.requests))
+        )
+        all_stable = all_stable and stable
+        calls = len(stub.requests) - first_request
+        hit = usage.cached_prompt_tokens / usage.prompt_tokens if usage.prompt_tokens else 0
+        print(
+            f"{turn:>4} {calls:>5} {usage.prompt_tokens:>8} {usage.cached_prompt_tokens:>8} "
+            f"{hit:>6.1%} {elapsed_ms:>6.1f}  {'yes' if stable else 'NO'}"
+        )
+
+    return all_stable
+
+
+if __name__ == "__main__":
+    if run_benchmark():
+        print("✅ Prompt prefix is stable across turns.")
+    else:
+        print("❌ Prompt prefix changed between turns.")
+        sys.exit(1)
@@ -1,13 +1,16 @@
-from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi import FastAPI, HTTPException, Depends, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
+import asyncio
 import logging
 
 from app.agent import ResumeAgent
 from app.config import HOST, PORT, ALLOW_ORIGINS
 from app.database import Database
+from app.events import EventBus, current_origin
+from app.usage import UsageTracker, quota_exceeded
 
 # Configure logging
 logging.basicConfig(
@@ -28,13 +31,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Tag database change events with the client that caused them
+@app.middleware("http")
+async def track_client_origin(request: Request, call_next):
+    token = current_origin.set(request.headers.get("X-Client-Id"))
+    try:
+        return await call_next(request)
+    finally:
+        current_origin.reset(token)
+
 # Initialize the resume agent
 resume_agent = ResumeAgent()
 
 # Database connection events
 @app.on_event("startup")
 async def startup_db_client():
-    await Database.connect_to_mongo()
+    # The API server owns the write-behind journal and replays it
+    await Database.connect_to_mongo(reconcile=True)
+    Database.start_health_monitor(reconcile=True)
+    Database.start_archiver()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
@@ -55,6 +70,7 @@ class ConversationUpdate(BaseModel):
 class ChatResponse(BaseModel):
     response: str
     conversation_id: str
+    usage: Optional[Dict[str, int]] = None
 
 class ConversationResponse(BaseModel):
     id: str
@@ -68,17 +84,31 @@ async def chat(request: ChatRequest):
         conversation_id = request.conversation_id
         if not conversation_id:
             conversation_id = await Database.create_conversation("Resume Conversation")
+        else:
+            # Reject runaway sessions before spending anything on the LLM
+            conversation = await Database.get_conversation(conversation_id)
+            reason = quota_exceeded(conversation.get("usage") if conversation else None)
+            if reason:
+                raise HTTPException(status_code=429, detail=reason)
         
         # Process the message with the resume agent, passing the conversation_id
-        response = resume_agent.process_message(request.message, conversation_id)
+        usage = UsageTracker()
+        try:
+            response = resume_agent.process_message(request.message, conversation_id, usage)
+        except Exception:
+            # A failed turn still spent tokens; count it so retries can't dodge the quota
+            await Database.record_usage(conversation_id, usage.as_increment())
+            raise
         
         # Save the user message
         await Database.add_message(conversation_id, request.message, "user")
         
-        # Save the bot response
-        await Database.add_message(conversation_id, response, "bot")
+        # Save the bot response along with what the turn cost
+        await Database.add_message(conversation_id, response, "bot", usage.as_increment())
         
-        return {"response": response, "conversation_id": conversation_id}
+        return {"response": response, "conversation_id": conversation_id, "usage": usage.as_increment()}
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing chat request: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -154,6 +184,55 @@ async def get_messages(conversation_id: str):
         logger.error(f"Error getting messages: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/usage/report")
+async def get_usage_report(limit: int = 10):
+    try:
+        return await Database.get_usage_report(limit)
+    except Exception as e:
+        logger.error(f"Error building usage report: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Push channel for conversation changes
+@app.websocket("/ws")
+async def conversation_updates(websocket: WebSocket, client_id: Optional[str] = None):
+    await websocket.accept()
+    subscription = EventBus.subscribe(client_id)
+
+    async def forward_events():
+        while True:
+            event = await subscription.get()
+            # The originating tab already applied its own change locally
+            if client_id and event.get("origin") == client_id:
+                continue
+            await websocket.send_json(event)
+
+    async def wait_for_disconnect():
+        # Clients don't send anything meaningful; reading detects disconnects
+        while True:
+            await websocket.receive_text()
+
+    sender = asyncio.create_task(forward_events())
+    receiver = asyncio.create_task(wait_for_disconnect())
+    try:
+        # Whichever side stops first ends the connection
+        await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        EventBus.unsubscribe(subscription)
+        sender_failed = sender.done() and not sender.cancelled() and sender.exception() is not None
+        for task in (sender, receiver):
+            task.cancel()
+            try:
+                await task
+            except (asyncio.CancelledError, WebSocketDisconnect):
+                pass
+            except Exception as e:
+                logger.debug(f"WebSocket task ended with error: {e}")
+        if sender_failed:
+            try:
+                await websocket.close()
+            except Exception:
+                pass
+
 # Error handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
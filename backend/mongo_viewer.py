@@ -1,15 +1,33 @@
 import asyncio
 import json
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, Request, Query, HTTPException
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from bson import json_util
+from bson.json_util import RELAXED_JSON_OPTIONS
 import uvicorn
 from app.database import Database
 from app.config import MONGO_DB_NAME
 import os
 
-app = FastAPI()
+# Largest page the browse endpoint will return
+MAX_PAGE_SIZE = 500
+# Documents fetched per round trip when streaming an export
+EXPORT_BATCH_SIZE = 1000
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled client for the lifetime of the viewer; the health check
+    # flips the status back once MongoDB answers (without replaying the journal)
+    await Database.connect_to_mongo()
+    Database.start_health_monitor()
+    yield
+    await Database.close_mongo_connection()
+
+app = FastAPI(lifespan=lifespan)
 
 # Create templates directory if it doesn't exist
 os.makedirs("templates", exist_ok=True)
@@ -83,6 +101,20 @@ with open("templates/index.html", "w") as f:
             background-color: #f8d7da;
             color: #721c24;
         }
+        .controls {
+            display: flex;
+            gap: 10px;
+            margin-bottom: 10px;
+        }
+        .controls input {
+            flex-grow: 1;
+            padding: 6px;
+        }
+        .stats {
+            font-size: 14px;
+            color: #555;
+            margin-bottom: 10px;
+        }
     </style>
 </head>
 <body>
@@ -105,30 +137,107 @@ with open("templates/index.html", "w") as f:
         
         <div class="data">
             <h3>Data</h3>
+            <div class="controls">
+                <input id="fields" placeholder="Fields, e.g. conversation_id,sender">
+                <input id="filters" placeholder='Filters, e.g. sender=bot; _id={"$oid": "..."}'>
+                <button onclick="reloadCollection()">Apply</button>
+            </div>
+            <div id="collection-stats" class="stats"></div>
             <div id="collection-data">
                 <p>Select a collection to view data</p>
             </div>
+            <div class="controls">
+                <button id="next-page" style="display: none" onclick="loadPage()">Next page</button>
+                <a id="export-link" style="display: none">Download all as NDJSON</a>
+            </div>
         </div>
     </div>
     
     <script>
-        function loadCollection(collection) {
-            fetch(`/api/collection/${collection}`)
+        let currentCollection = null;
+        let nextCursor = null;
+
+        function queryParams() {
+            const params = new URLSearchParams();
+            const fields = document.getElementById('fields').value.trim();
+            if (fields) {
+                params.set('fields', fields);
+            }
+            document.getElementById('filters').value.split(';')
+                .map(f => f.trim())
+                .filter(f => f)
+                .forEach(f => params.append('filter', f));
+            return params;
+        }
+
+        function formatBytes(bytes) {
+            if (bytes == null) return 'n/a';
+            const units = ['B', 'KB', 'MB', 'GB'];
+            let i = 0;
+            while (bytes >= 1024 && i < units.length - 1) {
+                bytes /= 1024;
+                i++;
+            }
+            return `${bytes.toFixed(1)} ${units[i]}`;
+        }
+
+        function loadStats(collection) {
+            fetch(`/api/collection/${collection}/stats`)
+                .then(response => response.json())
+                .then(stats => {
+                    const indexes = (stats.indexes || [])
+                        .map(index => `${index.name} (${formatBytes(index.size)})`)
+                        .join(', ');
+                    document.getElementById('collection-stats').textContent =
+                        `${stats.count} documents, ${formatBytes(stats.size)} data, ` +
+                        `${formatBytes(stats.storage_size)} on disk, ` +
+                        `${formatBytes(stats.total_index_size)} indexes: ${indexes}`;
+                });
+        }
+
+        function loadPage() {
+            const params = queryParams();
+            if (nextCursor) {
+                params.set('after', nextCursor);
+            }
+            fetch(`/api/collection/${currentCollection}?${params}`)
                 .then(response => response.json())
                 .then(data => {
-                    document.getElementById('collection-data').innerHTML = 
-                        `<h4>${collection}</h4>
-                         <pre>${JSON.stringify(data, null, 2)}</pre>`;
-                    
-                    // Highlight active collection
-                    document.querySelectorAll('.collection-item').forEach(item => {
-                        item.classList.remove('active');
-                        if(item.textContent.trim() === collection) {
-                            item.classList.add('active');
-                        }
-                    });
+                    const pre = document.createElement('pre');
+                    pre.textContent = data.detail
+                        ? data.detail
+                        : JSON.stringify(data.documents, null, 2);
+                    const container = document.getElementById('collection-data');
+                    container.innerHTML = '';
+                    container.appendChild(pre);
+
+                    nextCursor = data.next_cursor || null;
+                    document.getElementById('next-page').style.display = nextCursor ? 'inline-block' : 'none';
                 });
         }
+
+        function reloadCollection() {
+            if (!currentCollection) return;
+            nextCursor = null;
+            const exportLink = document.getElementById('export-link');
+            exportLink.href = `/api/collection/${currentCollection}/export?${queryParams()}`;
+            exportLink.style.display = 'inline';
+            loadPage();
+        }
+
+        function loadCollection(collection) {
+            currentCollection = collection;
+            loadStats(collection);
+            reloadCollection();
+
+            // Highlight active collection
+            document.querySelectorAll('.collection-item').forEach(item => {
+                item.classList.remove('active');
+                if(item.textContent.trim() === collection) {
+                    item.classList.add('active');
+                }
+            });
+        }
     </script>
 </body>
 </html>
@@ -136,9 +245,55 @@ with open("templates/index.html", "w") as f:
 
 templates = Jinja2Templates(directory="templates")
 
+def to_json(document) -> str:
+    """Serialize a document, including ObjectIds, dates and binary fields"""
+    return json_util.dumps(document, json_options=RELAXED_JSON_OPTIONS)
+
+def encode_cursor(value) -> str:
+    """Encode an _id as extended JSON so its BSON type survives the round trip"""
+    return json_util.dumps(value)
+
+def parse_value(raw: str):
+    """
+    Read a query-string value as extended JSON, e.g. {"$oid": "..."} for an
+    ObjectId or "abc" for a string; anything that isn't JSON is a plain string.
+    """
+    try:
+        return json_util.loads(raw)
+    except ValueError:
+        return raw
+
+def parse_filters(filters: List[str]) -> dict:
+    """Turn field=value pairs into an equality query"""
+    query = {}
+    for item in filters:
+        field, sep, raw = item.partition("=")
+        field = field.strip()
+        if not sep or not field or field.startswith("$"):
+            raise HTTPException(status_code=400, detail=f"Invalid filter: {item}")
+        value = parse_value(raw)
+        # Only equality is supported; operator documents are rejected
+        if isinstance(value, (dict, list)):
+            raise HTTPException(status_code=400, detail=f"Invalid filter: {item}")
+        query[field] = value
+    return query
+
+def parse_projection(fields: Optional[str]) -> Optional[dict]:
+    """Build a projection from a comma-separated field list"""
+    if not fields:
+        return None
+    return {field.strip(): 1 for field in fields.split(",") if field.strip()}
+
+async def get_collection_or_404(collection_name: str):
+    if not Database.use_mongodb:
+        raise HTTPException(status_code=503, detail="MongoDB not connected")
+    db = await Database.get_db()
+    if collection_name not in await db.list_collection_names():
+        raise HTTPException(status_code=404, detail="Collection not found")
+    return db[collection_name]
+
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
-    await Database.connect_to_mongo()
     mongodb_status = Database.use_mongodb
     
     collections = []
@@ -154,22 +309,80 @@ async def read_root(request: Request):
     })
 
 @app.get("/api/collection/{collection_name}")
-async def get_collection(collection_name: str):
-    if not Database.use_mongodb:
-        return {"error": "MongoDB not connected"}
-    
-    db = await Database.get_db()
-    collection = db[collection_name]
-    
-    # Get all documents in the collection
-    cursor = collection.find({})
-    documents = await cursor.to_list(length=100)  # Limit to 100 documents
-    
-    # Convert ObjectId to string for JSON serialization
-    for doc in documents:
-        doc["_id"] = str(doc["_id"])
-    
-    return documents
+async def get_collection(
+    collection_name: str,
+    after: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    filter: List[str] = Query([]),
+):
+    """Browse a page of documents in _id order, continuing after the given _id"""
+    collection = await get_collection_or_404(collection_name)
+
+    query = parse_filters(filter)
+    if after:
+        # Range on _id instead of skip, so deep pages stay as cheap as the first
+        try:
+            id_range = {"$gt": json_util.loads(after)}
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if "_id" in query:
+            id_range["$eq"] = query["_id"]
+        query["_id"] = id_range
+
+    cursor = collection.find(query, parse_projection(fields)).sort("_id", 1).limit(limit + 1)
+    documents = await cursor.to_list(length=limit + 1)
+
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    next_cursor = encode_cursor(documents[-1]["_id"]) if has_more else None
+
+    return Response(
+        content=to_json({"documents": documents, "next_cursor": next_cursor}),
+        media_type="application/json",
+    )
+
+@app.get("/api/collection/{collection_name}/export")
+async def export_collection(
+    collection_name: str,
+    fields: Optional[str] = None,
+    filter: List[str] = Query([]),
+):
+    """Stream every matching document as newline-delimited JSON"""
+    collection = await get_collection_or_404(collection_name)
+    cursor = collection.find(parse_filters(filter), parse_projection(fields)).batch_size(EXPORT_BATCH_SIZE)
+
+    async def generate():
+        async for document in cursor:
+            yield to_json(document) + "\n"
+
+    return StreamingResponse(
+        generate(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{collection_name}.ndjson"'},
+    )
+
+@app.get("/api/collection/{collection_name}/stats")
+async def get_collection_stats(collection_name: str):
+    """Report size, count and index details from collection metadata"""
+    collection = await get_collection_or_404(collection_name)
+
+    # $collStats reads storage metadata rather than the documents themselves
+    stats = await collection.aggregate([{"$collStats": {"storageStats": {}}}]).to_list(length=1)
+    storage = stats[0]["storageStats"] if stats else {}
+    indexes = await collection.index_information()
+
+    return {
+        "count": storage.get("count", await collection.estimated_document_count()),
+        "size": storage.get("size"),
+        "avg_obj_size": storage.get("avgObjSize"),
+        "storage_size": storage.get("storageSize"),
+        "total_index_size": storage.get("totalIndexSize"),
+        "indexes": [
+            {"name": name, "keys": info["key"], "size": storage.get("indexSizes", {}).get(name)}
+            for name, info in indexes.items()
+        ],
+    }
 
 if __name__ == "__main__":
     uvicorn.run(app, host="127.0.0.1", port=8082)
@@ -5,7 +5,7 @@ import { motion, AnimatePresence } from "framer-motion";
 import { FaRocket, FaSpinner } from "react-icons/fa";
 
 // Import utility functions from the index file
-import { getCanvasWidth, getChatWidth, extractCanvasContent, convertMarkdownToPDF } from "../utils";
+import { getCanvasWidth, getChatWidth, extractCanvasContent, convertMarkdownToPDF, CLIENT_ID, connectConversationUpdates } from "../utils";
 
 // Import components
 import MessageBubble from "./chat/MessageBubble";
@@ -15,6 +15,9 @@ import Header from "./chat/Header";
 import InputForm from "./chat/InputForm";
 import Sidebar from "./chat/Sidebar";
 
+// Identify this tab so the server can skip echoing our own changes
+axios.defaults.headers.common["X-Client-Id"] = CLIENT_ID;
+
 /**
  * Main ChatApp component that orchestrates the entire application
  */
@@ -44,6 +47,12 @@ export default function ChatApp() {
   const messagesEndRef = useRef(null);
   const chatContainerRef = useRef(null);
   const inputRef = useRef(null);
+  const activeConversationIdRef = useRef(null);
+
+  // Keep the latest active conversation available to the push channel handler
+  useEffect(() => {
+    activeConversationIdRef.current = activeConversationId;
+  }, [activeConversationId]);
 
   // Check if screen is mobile size
   useEffect(() => {
@@ -71,6 +80,67 @@ export default function ChatApp() {
     fetchConversations();
   }, []);
 
+  // Apply changes made in other tabs as they are pushed from the server
+  useEffect(() => {
+    const resync = async () => {
+      await fetchConversations();
+      if (activeConversationIdRef.current) {
+        await loadConversation(activeConversationIdRef.current);
+      }
+    };
+
+    const handleUpdate = (event) => {
+      switch (event.type) {
+        case "conversation_created":
+          setConversations(prev =>
+            prev.some(conv => conv._id === event.conversation._id)
+              ? prev
+              : [event.conversation, ...prev]
+          );
+          break;
+        case "conversation_updated":
+          setConversations(prev => prev.map(conv =>
+            conv._id === event.conversation_id
+              ? { ...conv, title: event.title, updated_at: event.updated_at }
+              : conv
+          ));
+          break;
+        case "conversation_deleted":
+          setConversations(prev => prev.filter(conv => conv._id !== event.conversation_id));
+          if (activeConversationIdRef.current === event.conversation_id) {
+            setMessages([]);
+            setActiveConversationId(null);
+            setIsTempChat(true);
+          }
+          break;
+        case "message_added":
+          // Move the conversation to the top, as the server sorts by updated_at
+          setConversations(prev => {
+            const conv = prev.find(c => c._id === event.conversation_id);
+            if (!conv) return prev;
+            const updated = { ...conv, updated_at: event.message.created_at };
+            return [updated, ...prev.filter(c => c._id !== event.conversation_id)];
+          });
+          if (activeConversationIdRef.current === event.conversation_id) {
+            setMessages(prev => [...prev, {
+              text: event.message.text,
+              sender: event.message.sender,
+              error: false
+            }]);
+          }
+          break;
+        case "resync":
+          resync();
+          break;
+        default:
+          break;
+      }
+    };
+
+    // Events may have been missed while disconnected, so refetch on reconnect
+    return connectConversationUpdates(handleUpdate, resync);
+  }, []);
+
   // Fetch all conversations from the API
   const fetchConversations = async () => {
     try {
@@ -79,7 +149,7 @@ export default function ChatApp() {
       setConversations(response.data);
       
       // If there are conversations, set the first one as active
-      if (response.data.length > 0 && !activeConversationId) {
+      if (response.data.length > 0 && !activeConversationIdRef.current) {
         setActiveConversationId(response.data[0]._id);
         await loadConversation(response.data[0]._id);
         setIsTempChat(false);
@@ -120,7 +190,10 @@ export default function ChatApp() {
       };
       
       // Update conversations list with the new conversation
-      setConversations(prevConversations => [newConversation, ...prevConversations]);
+      setConversations(prevConversations => [
+        newConversation,
+        ...prevConversations.filter(conv => conv._id !== newConversation._id)
+      ]);
       
       return newConversation._id;
     } catch (error) {
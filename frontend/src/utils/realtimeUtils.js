@@ -0,0 +1,58 @@
+/**
+ * Utility functions for the conversation update push channel
+ */
+
+/**
+ * Identifier for this browser tab, sent with API requests so the server
+ * doesn't echo our own changes back over the WebSocket
+ */
+export const CLIENT_ID = Math.random().toString(36).slice(2) + Date.now().toString(36);
+
+/**
+ * Opens the /ws channel and reconnects with backoff when it drops
+ * @param {Function} onEvent - Called with each parsed event
+ * @param {Function} onReconnect - Called after a reconnect, when events may have been missed
+ * @returns {Function} - Closes the connection and stops reconnecting
+ */
+export const connectConversationUpdates = (onEvent, onReconnect) => {
+  let socket = null;
+  let closed = false;
+  let retryDelay = 1000;
+  let hasConnected = false;
+
+  const connect = () => {
+    socket = new WebSocket(`ws://127.0.0.1:8000/ws?client_id=${CLIENT_ID}`);
+
+    socket.onopen = () => {
+      retryDelay = 1000;
+      if (hasConnected && onReconnect) {
+        onReconnect();
+      }
+      hasConnected = true;
+    };
+
+    socket.onmessage = (event) => {
+      try {
+        onEvent(JSON.parse(event.data));
+      } catch (error) {
+        console.error("Error handling conversation update:", error);
+      }
+    };
+
+    socket.onclose = () => {
+      if (!closed) {
+        setTimeout(connect, retryDelay);
+        retryDelay = Math.min(retryDelay * 2, 30000);
+      }
+    };
+  };
+
+  connect();
+
+  return () => {
+    closed = true;
+    if (socket) {
+      socket.close();
+    }
+  };
+};